@@ -1,13 +1,19 @@
 """FastAPI routes for the streaming data API."""
 import csv
+import hashlib
 import io
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
+from functools import lru_cache
+from typing import List, Optional, Iterator, Dict, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, undefer_group
+from sqlalchemy import func, desc, and_, select
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
+from app.collector.scheduler import get_collector, COLLECTION_LOCKS
 from app.models import Channel, LiveSnapshot
 from app.schemas import (
     LiveStreamResponse,
@@ -19,28 +25,120 @@ from app.schemas import (
 
 router = APIRouter()
 
+# Snapshot columns in LiveSnapshotSchema field order, for streamed history rows
+HISTORY_SNAPSHOT_COLUMNS = tuple(LiveSnapshot.__table__.c[name] for name in LiveSnapshotSchema.model_fields)
+HISTORY_BATCH_SIZE = 500
+
+# Category aggregates only change when the collector writes (every couple of
+# minutes), so results are reused per (platform, window, limit) for a minute,
+# or until invalidate_category_stats_cache() drops them after a write
+CATEGORY_STATS_TTL = 60  # seconds
+CATEGORY_STATS_CACHE_MAX = 256
+_category_stats_cache: Dict[Tuple[str, str, int], Tuple[float, List[CategoryStats]]] = {}
+
+# Live stream lists only change when the collector writes, so clients may reuse
+# them briefly and then revalidate against an ETag of the latest collection
+LIST_CACHE_CONTROL = "public, max-age=30"
+
+# Only channels with a snapshot this recent count as live
+LIVE_WINDOW = timedelta(hours=1)
+
+# Routes that only do blocking SQLAlchemy work are plain ``def``: FastAPI runs
+# them, and their response_model validation, in its threadpool so large queries
+# and serialisation don't stall the event loop
+
+
+def invalidate_category_stats_cache(platform: Optional[str] = None):
+    """
+    Forget cached category stats, for one platform or all of them.
+
+    Call this after a collection or deletion so the next request reflects it.
+    """
+    if platform is None:
+        _category_stats_cache.clear()
+        return
+    for key in [key for key in _category_stats_cache if key[0] == platform]:
+        _category_stats_cache.pop(key, None)
+
 
 def parse_time_window(window: str) -> datetime:
     """
     Parse time window string (e.g., '24h', '7d', '30d') to datetime.
     """
-    now = datetime.utcnow()
-    
+    return datetime.utcnow() - _parse_window_delta(window)
+
+
+@lru_cache(maxsize=64)
+def _parse_window_delta(window: str) -> timedelta:
+    """Window string to timedelta; cached since clients reuse a handful of values."""
     if window.endswith('h'):
-        hours = int(window[:-1])
-        return now - timedelta(hours=hours)
+        return timedelta(hours=int(window[:-1]))
     elif window.endswith('d'):
-        days = int(window[:-1])
-        return now - timedelta(days=days)
+        return timedelta(days=int(window[:-1]))
     elif window.endswith('w'):
-        weeks = int(window[:-1])
-        return now - timedelta(weeks=weeks)
+        return timedelta(weeks=int(window[:-1]))
     else:
         raise ValueError(f"Invalid time window format: {window}")
 
 
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the request's If-None-Match covers ``etag``.
+
+    Uses the weak comparison conditional GETs call for: a ``W/`` prefix on
+    either side is ignored, and ``*`` matches any current representation.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def _not_modified(
+    request: Request,
+    response: Response,
+    db: Session,
+    platform: str,
+    limit: int,
+    since: datetime
+) -> Optional[Response]:
+    """
+    Tag a live stream list and answer conditional GETs for it.
+
+    The list is the latest snapshot per ``platform`` channel collected after
+    ``since``, so it changes when a collection for that platform lands (the
+    newest in-window snapshot moves) or when its snapshots age out of the
+    window (the oldest one moves).
+    Both go into the ETag along with the route and query parameters.
+
+    Sets ETag and Cache-Control on ``response``; returns a 304 to send instead
+    when the client's copy is still current.
+    """
+    oldest, latest = db.query(
+        func.min(LiveSnapshot.collected_at),
+        func.max(LiveSnapshot.collected_at)
+    ).join(Channel).filter(
+        Channel.platform == platform,
+        LiveSnapshot.collected_at >= since
+    ).one()
+    tag_source = f"{request.url.path}:{platform}:{limit}:{oldest}:{latest}"
+    etag = f'"{hashlib.md5(tag_source.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+    response.headers.update(headers)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
 @router.get("/live/top", response_model=List[LiveStreamResponse])
-async def get_top_live_streams(
+def get_top_live_streams(
+    request: Request,
+    response: Response,
     platform: str = Query("twitch", description="Platform: twitch or kick"),
     limit: int = Query(50, ge=1, le=500, description="Number of results to return"),
     db: Session = Depends(get_db)
@@ -53,9 +151,20 @@ async def get_top_live_streams(
     - 'viewers': Sort by current viewer count (default)
     - 'followers': Sort by channel follower count
     """
-    # Only show streams from the last 1 hour to ensure they're actually live
-    recent_time = datetime.utcnow() - timedelta(hours=1)
-    
+    recent_time = datetime.utcnow() - LIVE_WINDOW
+    not_modified = _not_modified(request, response, db, platform, limit, recent_time)
+    if not_modified is not None:
+        return not_modified
+    return _query_top_live_streams(db, platform, limit, recent_time)
+
+
+def _query_top_live_streams(
+    db: Session,
+    platform: str,
+    limit: int,
+    recent_time: datetime
+) -> List[LiveStreamResponse]:
+    """Latest snapshot per channel collected since ``recent_time``, highest viewer count first."""
     # Subquery to get the latest snapshot ID for each channel (only recent ones)
     subquery = (
         db.query(
@@ -97,8 +206,9 @@ async def get_top_live_streams(
     
     results = query.limit(limit).all()
     
+    # Trusted ORM rows; response_model validates the output, so skip validating twice
     return [
-        LiveStreamResponse(
+        LiveStreamResponse.model_construct(
             platform=channel.platform,
             channel_id=channel.channel_id,
             username=channel.username,
@@ -118,7 +228,7 @@ async def get_top_live_streams(
 
 
 @router.get("/live/most-active")
-async def get_most_active_streamers(
+def get_most_active_streamers(
     platform: str = Query("twitch", description="Platform: twitch or kick"),
     window: str = Query("7d", description="Time window: e.g., '24h', '7d', '30d'"),
     limit: int = Query(10, ge=1, le=100, description="Number of results to return"),
@@ -208,7 +318,7 @@ async def get_most_active_streamers(
 
 
 @router.get("/search")
-async def search_streams(
+def search_streams(
     platform: str = Query("kick", description="Platform: twitch or kick"),
     q: str = Query(..., description="Search query"),
     limit: int = Query(50, ge=1, le=500, description="Number of results to return"),
@@ -282,7 +392,7 @@ async def search_streams(
 
 
 @router.get("/channel/{platform}/{channel_id}/history", response_model=ChannelHistoryResponse)
-async def get_channel_history(
+def get_channel_history(
     platform: str,
     channel_id: str,
     window: str = Query("24h", description="Time window: e.g., '24h', '7d', '30d'"),
@@ -298,14 +408,14 @@ async def get_channel_history(
         raise HTTPException(status_code=400, detail=str(e))
     
     # Try to find channel by channel_id first, then by username if not found
-    channel = db.query(Channel).filter(
+    channel = db.query(Channel).options(undefer_group("profile")).filter(
         Channel.platform == platform,
         Channel.channel_id == channel_id
     ).first()
     
     if not channel:
         # If not found by channel_id, try by username
-        channel = db.query(Channel).filter(
+        channel = db.query(Channel).options(undefer_group("profile")).filter(
             Channel.platform == platform,
             Channel.username == channel_id
         ).first()
@@ -313,40 +423,56 @@ async def get_channel_history(
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
-    # Get snapshots within time window
-    snapshots = (
-        db.query(LiveSnapshot)
-        .filter(
+    head = orjson.dumps({"channel": ChannelSchema.model_validate(channel).model_dump(mode="json")})
+    # yield_per on the statement (not just the result) makes psycopg2 use a
+    # server-side cursor, so rows really do arrive in batches
+    snapshots_query = (
+        select(*HISTORY_SNAPSHOT_COLUMNS)
+        .where(
             LiveSnapshot.channel_id == channel.id,
             LiveSnapshot.collected_at >= start_time
         )
         .order_by(LiveSnapshot.collected_at)
-        .all()
+        .execution_options(yield_per=HISTORY_BATCH_SIZE)
     )
-    
-    if not snapshots:
-        return ChannelHistoryResponse(
-            channel=ChannelSchema.model_validate(channel),
-            snapshots=[],
-            total_snapshots=0,
-            avg_viewer_count=0.0,
-            peak_viewer_count=0
-        )
-    
-    # Calculate statistics
-    viewer_counts = [s.viewer_count for s in snapshots]
-    
-    return ChannelHistoryResponse(
-        channel=ChannelSchema.model_validate(channel),
-        snapshots=[LiveSnapshotSchema.model_validate(s) for s in snapshots],
-        total_snapshots=len(snapshots),
-        avg_viewer_count=sum(viewer_counts) / len(viewer_counts),
-        peak_viewer_count=max(viewer_counts)
+    return StreamingResponse(
+        _stream_history(head, snapshots_query),
+        media_type="application/json"
     )
 
 
+def _stream_history(head: bytes, snapshots_query) -> Iterator[bytes]:
+    """
+    Emit a ChannelHistoryResponse body with the snapshots fetched and
+    encoded in batches, so long histories never sit in memory at once.
+
+    The statistics are accumulated from the streamed rows and written after
+    them, so they always describe exactly the snapshots returned. Uses its
+    own session: the request's session may already be closed by the time
+    the response body is being sent.
+    """
+    yield head[:-1] + b',"snapshots":['
+    separator = b""
+    total = viewer_rows = viewer_sum = peak_viewers = 0
+    with SessionLocal() as db:
+        for batch in db.execute(snapshots_query).partitions():
+            yield separator + b",".join(orjson.dumps(dict(row._mapping)) for row in batch)
+            separator = b","
+            total += len(batch)
+            for row in batch:
+                if row.viewer_count is not None:
+                    viewer_rows += 1
+                    viewer_sum += row.viewer_count
+                    peak_viewers = max(peak_viewers, row.viewer_count)
+    yield b"]," + orjson.dumps({
+        "total_snapshots": total,
+        "avg_viewer_count": viewer_sum / viewer_rows if viewer_rows else 0.0,
+        "peak_viewer_count": peak_viewers
+    })[1:]
+
+
 @router.get("/stats/categories", response_model=List[CategoryStats])
-async def get_category_stats(
+def get_category_stats(
     platform: str = Query("twitch", description="Platform: twitch or kick"),
     window: str = Query("7d", description="Time window: e.g., '24h', '7d', '30d'"),
     limit: int = Query(10, ge=1, le=100, description="Number of categories to return"),
@@ -360,11 +486,17 @@ async def get_category_stats(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    # Aggregate statistics by game
+    cache_key = (platform, window, limit)
+    cached = _category_stats_cache.get(cache_key)
+    if cached and time.monotonic() < cached[0]:
+        return cached[1]
+    
+    # Aggregate statistics by game. COUNT(*) rather than COUNT(id): id isn't
+    # in idx_game_collected_viewers, and reading it would mean heap visits
     results = (
         db.query(
             LiveSnapshot.game_name,
-            func.count(LiveSnapshot.id).label("total_streams"),
+            func.count().label("total_streams"),
             func.sum(LiveSnapshot.viewer_count).label("total_viewers"),
             func.avg(LiveSnapshot.viewer_count).label("avg_viewers"),
             func.max(LiveSnapshot.viewer_count).label("peak_viewers")
@@ -381,7 +513,7 @@ async def get_category_stats(
         .all()
     )
     
-    return [
+    stats = [
         CategoryStats(
             game_name=row.game_name,
             total_streams=row.total_streams,
@@ -391,10 +523,15 @@ async def get_category_stats(
         )
         for row in results
     ]
+    
+    if len(_category_stats_cache) >= CATEGORY_STATS_CACHE_MAX:
+        _category_stats_cache.clear()
+    _category_stats_cache[cache_key] = (time.monotonic() + CATEGORY_STATS_TTL, stats)
+    return stats
 
 
 @router.get("/export/csv")
-async def export_csv(
+def export_csv(
     platform: str = Query("twitch", description="Platform: twitch or kick"),
     window: str = Query("24h", description="Time window: e.g., '24h', '7d', '30d'"),
     db: Session = Depends(get_db)
@@ -474,7 +611,9 @@ async def export_csv(
 
 # Frontend-compatible endpoints
 @router.get("/streams")
-async def get_streams(
+def get_streams(
+    request: Request,
+    response: Response,
     platform: str = Query("kick", description="Platform: twitch or kick"),
     limit: int = Query(50, ge=1, le=500, description="Number of results to return"),
     db: Session = Depends(get_db)
@@ -482,9 +621,14 @@ async def get_streams(
     """
     Get live streams for frontend compatibility.
     """
+    recent_time = datetime.utcnow() - LIVE_WINDOW
     try:
-        # Call the existing top live streams endpoint and convert to expected format
-        api_streams = await get_top_live_streams(platform=platform, limit=limit, db=db)
+        not_modified = _not_modified(request, response, db, platform, limit, recent_time)
+        if not_modified is not None:
+            return not_modified
+        
+        # Reuse the top live streams query and convert to expected format
+        api_streams = _query_top_live_streams(db, platform, limit, recent_time)
         
         if not api_streams:
             # If no streams returned, use demo data
@@ -510,6 +654,10 @@ async def get_streams(
         return {"streams": streams}
     except Exception as e:
         print(f"Error in get_streams: {e}")
+        # Not a representation of the list, so nothing a client should revalidate
+        for header in ("ETag", "Cache-Control"):
+            if header in response.headers:
+                del response.headers[header]
         # Return empty result with a message instead of fake demo data
         return {
             "streams": [],
@@ -518,7 +666,7 @@ async def get_streams(
 
 
 @router.get("/categories")
-async def get_categories(
+def get_categories(
     platform: str = Query("twitch", description="Platform: twitch or kick"),
     limit: int = Query(50, ge=1, le=500, description="Number of results to return"),
     db: Session = Depends(get_db)
@@ -528,7 +676,7 @@ async def get_categories(
     """
     try:
         # Call the existing stats endpoint
-        categories = await get_category_stats(platform=platform, window="24h", limit=limit, db=db)
+        categories = get_category_stats(platform=platform, window="24h", limit=limit, db=db)
         
         # Convert to expected format
         result = []
@@ -553,7 +701,7 @@ async def get_categories(
 
 
 @router.get("/channel-history")
-async def get_channel_history_search(
+def get_channel_history_search(
     platform: str = Query("kick", description="Platform: twitch or kick"),
     channel: str = Query(..., description="Channel ID or username"),
     timeWindow: str = Query("24h", description="Time window: 24h, 7d, 30d"),
@@ -658,15 +806,22 @@ async def collect_all_data():
     Trigger data collection for all platforms.
     """
     try:
-        # Import here to avoid circular imports
-        from app.collector.scheduler import StreamCollector
-        
-        # Create collector instance and run collection
-        collector = StreamCollector()
+        # The shared collector keeps its API clients open between runs; a
+        # throwaway one would leak both connection pools
+        collector = get_collector()
         
-        # Run collection for both platforms
-        await collector.collect_kick_streams()
-        await collector.collect_twitch_streams()
+        # Run collection for both platforms, queueing behind any run already
+        # in progress (e.g. the background job) rather than racing it
+        async with COLLECTION_LOCKS["kick"]:
+            try:
+                await collector.collect_kick_streams()
+            finally:
+                invalidate_category_stats_cache("kick")
+        async with COLLECTION_LOCKS["twitch"]:
+            try:
+                await collector.collect_twitch_streams()
+            finally:
+                invalidate_category_stats_cache("twitch")
         
         return {"status": "success", "message": "Data collection completed successfully"}
     except Exception as e:
@@ -674,7 +829,7 @@ async def collect_all_data():
 
 
 @router.post("/clear-data")
-async def clear_all_data(db: Session = Depends(get_db)):
+def clear_all_data(db: Session = Depends(get_db)):
     """
     Clear all stream data from database (for testing purposes).
     """
@@ -684,6 +839,9 @@ async def clear_all_data(db: Session = Depends(get_db)):
         # Delete all channels
         db.query(Channel).delete()
         db.commit()
+        # The collector caches channel primary keys between cycles
+        get_collector().invalidate_channel_cache()
+        invalidate_category_stats_cache()
         
         return {"status": "success", "message": "All data cleared successfully"}
     except Exception as e:
@@ -692,7 +850,7 @@ async def clear_all_data(db: Session = Depends(get_db)):
 
 
 @router.get("/search-db", response_model=List[LiveStreamResponse])
-async def search_streams_database(
+def search_streams_database(
     platform: str = Query("twitch", description="Platform: twitch, or kick"),
     q: str = Query(..., description="Search query (title, game, or username)"),
     limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
@@ -737,8 +895,9 @@ async def search_streams_database(
         .all()
     )
     
+    # Trusted ORM rows; response_model validates the output, so skip validating twice
     return [
-        LiveStreamResponse(
+        LiveStreamResponse.model_construct(
             platform=channel.platform,
             channel_id=channel.channel_id,
             username=channel.username,
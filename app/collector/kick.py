@@ -1,8 +1,9 @@
 """Kick API client for collecting live stream data."""
 import asyncio
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
 import httpx
+import orjson
 from loguru import logger
 from app.config import settings
 
@@ -13,16 +14,24 @@ class KickClient:
     OAUTH_URL = "https://id.kick.com/oauth/token"
     BASE_URL = "https://api.kick.com/public/v1"
     
+    # App access tokens by client_id, so new client instances skip the OAuth round-trip
+    _token_cache: Dict[str, Tuple[str, datetime]] = {}
+    
     def __init__(self, client_id: str, client_secret: str):
         self.client_id = client_id
         self.client_secret = client_secret
         self._http_client: Optional[httpx.AsyncClient] = None
         self._access_token: Optional[str] = None
+        self._token_expires_at: Optional[datetime] = None
+        cached_token = self._token_cache.get(client_id)
+        if cached_token:
+            self._access_token, self._token_expires_at = cached_token
 
     async def __aenter__(self):
         """Async context manager entry."""
-        self._http_client = httpx.AsyncClient(timeout=30.0)
-        await self._get_access_token()
+        self._http_client = httpx.AsyncClient(timeout=30.0, http2=True)
+        if not self._access_token or datetime.now(timezone.utc) >= self._token_expires_at:
+            await self._get_access_token()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -45,8 +54,12 @@ class KickClient:
                 }
             )
             response.raise_for_status()
-            token_data = response.json()
+            token_data = orjson.loads(response.content)
             self._access_token = token_data["access_token"]
+            # Refresh 5 minutes early; a 401 mid-request also triggers a refresh
+            expires_in = token_data.get("expires_in", 3600)
+            self._token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in - 300)
+            KickClient._token_cache[self.client_id] = (self._access_token, self._token_expires_at)
             logger.info("Successfully obtained Kick access token")
             return self._access_token
         except Exception as e:
@@ -72,10 +85,15 @@ class KickClient:
                 params=params or {}
             )
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
 
         except httpx.HTTPStatusError as e:
-            if retries < settings.max_retries:
+            if e.response.status_code == 401 and retries < settings.max_retries:
+                # Token expired on a long-lived client, get a fresh one
+                logger.warning("Kick token rejected, re-authenticating...")
+                await self._get_access_token()
+                return await self._make_request(endpoint, params, retries + 1)
+            elif retries < settings.max_retries:
                 # Exponential backoff
                 wait_time = settings.retry_backoff_factor ** retries
                 logger.warning(f"Request failed, retrying in {wait_time}s... (attempt {retries + 1})")
@@ -106,7 +124,7 @@ class KickClient:
             "language": language
         }
         result = await self._make_request(endpoint, params)
-        logger.debug(f"Livestreams API response (first 2): {result.get('data', [])[:2]}")
+        logger.opt(lazy=True).debug("Livestreams API response (first 2): {}", lambda: result.get("data", [])[:2])
         return result.get("data", [])
 
     async def get_channel_info(self, channel_slug: str) -> Dict[str, Any]:
@@ -123,7 +141,7 @@ class KickClient:
             endpoint = f"channels/{channel_slug}"
             result = await self._make_request(endpoint)
             
-            logger.debug(f"Channel info for {channel_slug}: followers={result.get('followers_count', 0)}")
+            logger.debug("Channel info for {}: followers={}", channel_slug, result.get("followers_count", 0))
             return result
             
         except Exception as e:
@@ -1,17 +1,24 @@
 """Data collection scheduler."""
 import asyncio
 import sys
-from datetime import datetime
-from typing import List, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, insert, case, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.config import settings
-from app.database import SessionLocal, init_db
+from app.database import SessionLocal, init_db, engine
 from app.models import Channel, LiveSnapshot
 from app.collector.twitch import TwitchClient
-from app.collector.kick import KickClient  # Import official KickClient
+from app.collector.kick import KickClient
 
 
 # Configure logger
@@ -19,101 +26,296 @@ logger.remove()
 logger.add(
     sys.stdout,
     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <level>{message}</level>",
-    level="INFO"
+    level="INFO",
+    enqueue=True
 )
 logger.add(
     "logs/collector_{time:YYYY-MM-DD}.log",
     rotation="1 day",
     retention="30 days",
-    level="DEBUG"
+    level="DEBUG",
+    enqueue=True,  # both sinks write from a background worker, not the event loop
+    backtrace=False,
+    diagnose=False
 )
 
+_UTC = timezone.utc
+
+
+def _db_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Convert to naive UTC, which is how every timestamp column stores time.
+
+    Naive values are assumed to be UTC already.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(_UTC).replace(tzinfo=None)
+
+
+# Upper bound on channels remembered between cycles, per platform
+CHANNEL_CACHE_SIZE = 100_000
+
+# Seconds between refreshes of the snapshots-by-platform join in the stats
+PLATFORM_STATS_TTL = 3600
+
+# PostgreSQL planner row estimates plus the latest collection, see _table_totals.
+# to_regclass resolves the names through search_path, as the ORM's queries do,
+# so a same-named table in another schema can't match
+_PG_TABLE_TOTALS = text(
+    "SELECT "
+    "(SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('channels')), "
+    "(SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('live_snapshots')), "
+    "(SELECT MAX(collected_at) FROM live_snapshots)"
+)
+
+# ON CONFLICT is dialect-specific; pick the insert() matching the configured engine
+_dialect_insert = sqlite_insert if engine.dialect.name == "sqlite" else pg_insert
+
+# Caps concurrent collector write transactions across all StreamCollector
+# instances. SQLite has a single writer, so saves there take turns instead
+# of contending for the file lock.
+_DB_WRITE_SLOTS = threading.BoundedSemaphore(1 if engine.dialect.name == "sqlite" else 8)
+
 
 class StreamCollector:
     """Main collector class for gathering stream data."""
     
     def __init__(self):
-        self.db: Session = SessionLocal()
+        # platform -> LRU of channel_id -> (pk, username, display_name, follower_count)
+        # as last written, so unchanged channels skip the upsert. One LRU per
+        # platform because each platform is saved from its own worker thread.
+        self._channel_cache: Dict[str, "OrderedDict[str, Tuple[int, str, str, int]]"] = {}
+        # "<platform>_channels" / "<platform>_snapshots" written by the last cycle
+        self._cycle_metrics: Dict[str, int] = {}
+        # Cached snapshots-by-platform join, see get_collection_stats
+        self._platform_counts: Optional[Dict[str, int]] = None
+        self._platform_counts_at = 0.0
+        # Kept open across cycles so keep-alive connections and OAuth tokens are reused
+        self._twitch: Optional[TwitchClient] = None
+        self._kick: Optional[KickClient] = None
+    
+    async def __aenter__(self):
+        return self
     
-    def __del__(self):
-        """Cleanup database session."""
-        if hasattr(self, 'db'):
-            self.db.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
     
-    def get_or_create_channel(
+    async def aclose(self):
+        """Close the API clients held open between cycles."""
+        for attr in ("_twitch", "_kick"):
+            client = getattr(self, attr)
+            if client is not None:
+                setattr(self, attr, None)
+                await client.__aexit__(None, None, None)
+    
+    def invalidate_channel_cache(self, platform: Optional[str] = None):
+        """
+        Forget cached channel primary keys, for one platform or all of them.
+
+        Call this after deleting channel rows, otherwise the next cycle would
+        write snapshots against primary keys that no longer exist.
+        """
+        if platform is None:
+            self._channel_cache.clear()
+        else:
+            self._channel_cache.pop(platform, None)
+    
+    @staticmethod
+    async def _open_client(client):
+        """Enter ``client``'s async context, closing it again if that fails."""
+        try:
+            await client.__aenter__()
+        except Exception:
+            await client.__aexit__(None, None, None)
+            raise
+        return client
+    
+    async def _get_twitch_client(self) -> TwitchClient:
+        """Return the shared TwitchClient, opening and authenticating it on first use."""
+        if self._twitch is None:
+            self._twitch = await self._open_client(TwitchClient())
+        return self._twitch
+    
+    async def _get_kick_client(self) -> KickClient:
+        """Return the shared KickClient, opening and authenticating it on first use."""
+        if self._kick is None:
+            self._kick = await self._open_client(KickClient(
+                client_id=settings.KICK_CLIENT_ID,
+                client_secret=settings.KICK_CLIENT_SECRET
+            ))
+        return self._kick
+    
+    @staticmethod
+    def _snapshot_row(
+        channel_pk: int,
+        stream_data: Dict[str, Any],
+        collected_at: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Map parsed stream data onto live_snapshots column values.
+        """
+        return {
+            "channel_id": channel_pk,
+            "title": stream_data.get("title"),
+            "game_name": stream_data.get("game_name"),
+            "game_id": stream_data.get("game_id"),
+            "viewer_count": stream_data.get("viewer_count", 0),
+            "language": stream_data.get("language"),
+            "started_at": _db_utc(stream_data.get("started_at")),
+            "thumbnail_url": stream_data.get("thumbnail_url"),
+            "stream_url": stream_data.get("stream_url"),
+            "collected_at": _db_utc(collected_at or datetime.now(_UTC))
+        }
+    
+    def _upsert_channels(
         self,
+        db: Session,
         platform: str,
-        channel_id: str,
-        username: str,
-        display_name: str = None,
-        description: str = None,
-        profile_image_url: str = None,
-        follower_count: int = 0
-    ) -> Channel:
+        streams: List[Dict[str, Any]],
+        updated_at: datetime
+    ) -> Dict[str, int]:
         """
-        Get existing channel or create new one.
+        Map each stream's channel_id to its channel primary key.
+
+        Channels whose username, display name and follower count match what
+        was last written are served from the in-process cache; the rest go
+        out as a single INSERT ... ON CONFLICT DO UPDATE.
         """
-        channel = self.db.query(Channel).filter(
-            Channel.platform == platform,
-            Channel.channel_id == channel_id
-        ).first()
+        cache = self._channel_cache.setdefault(platform, OrderedDict())
+        channel_pks = {}
+        channel_rows = {}
+        updated_at = _db_utc(updated_at)
+        for stream_data in streams:
+            channel_id = stream_data["channel_id"]
+            username = stream_data["username"]
+            display_name = stream_data.get("display_name") or username
+            follower_count = stream_data.get("follower_count", 0)
+            
+            cached = cache.get(channel_id)
+            # A zero follower count never overwrites a known one (see below)
+            if cached and cached[1:3] == (username, display_name) and follower_count in (0, cached[3]):
+                cache.move_to_end(channel_id)
+                channel_pks[channel_id] = cached[0]
+                continue
+            
+            channel_rows[channel_id] = {
+                "platform": platform,
+                "channel_id": channel_id,
+                "username": username,
+                "display_name": display_name,
+                "follower_count": follower_count,
+                "created_at": updated_at,
+                "updated_at": updated_at
+            }
         
-        if channel:
-            # Update existing channel
-            channel.username = username
-            channel.display_name = display_name or username
-            if description:
-                channel.description = description
-            if profile_image_url:
-                channel.profile_image_url = profile_image_url
-            if follower_count > 0:
-                channel.follower_count = follower_count
-            channel.updated_at = datetime.utcnow()
-        else:
-            # Create new channel
-            channel = Channel(
-                platform=platform,
-                channel_id=channel_id,
-                username=username,
-                display_name=display_name or username,
-                description=description,
-                profile_image_url=profile_image_url,
-                follower_count=follower_count
+        if channel_rows:
+            stmt = _dialect_insert(Channel).values(list(channel_rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["platform", "channel_id"],
+                set_={
+                    "username": stmt.excluded.username,
+                    "display_name": stmt.excluded.display_name,
+                    "follower_count": case(
+                        (stmt.excluded.follower_count > 0, stmt.excluded.follower_count),
+                        else_=Channel.follower_count
+                    ),
+                    "updated_at": stmt.excluded.updated_at
+                }
+            ).returning(
+                Channel.id, Channel.channel_id, Channel.username,
+                Channel.display_name, Channel.follower_count
             )
-            self.db.add(channel)
+            for pk, channel_id, username, display_name, follower_count in db.execute(stmt):
+                channel_pks[channel_id] = pk
+                cache[channel_id] = (pk, username, display_name, follower_count)
+                cache.move_to_end(channel_id)
+            
+            while len(cache) > CHANNEL_CACHE_SIZE:
+                cache.popitem(last=False)
         
-        self.db.commit()
-        self.db.refresh(channel)
-        return channel
+        return channel_pks
     
-    def create_snapshot(self, channel: Channel, stream_data: Dict[str, Any]) -> LiveSnapshot:
+    def _save_streams(
+        self,
+        platform: str,
+        streams: List[Dict[str, Any]],
+        collected_at: datetime
+    ) -> int:
         """
-        Create a new live snapshot record.
+        Persist parsed streams for one platform using a dedicated session.
+
+        This is synchronous on purpose: callers run it via asyncio.to_thread
+        so the blocking SQLAlchemy round-trips don't stall the event loop.
         """
-        snapshot = LiveSnapshot(
-            channel_id=channel.id,
-            title=stream_data.get("title"),
-            game_name=stream_data.get("game_name"),
-            game_id=stream_data.get("game_id"),
-            viewer_count=stream_data.get("viewer_count", 0),
-            language=stream_data.get("language"),
-            started_at=stream_data.get("started_at"),
-            thumbnail_url=stream_data.get("thumbnail_url"),
-            stream_url=stream_data.get("stream_url"),
-            collected_at=datetime.utcnow()
-        )
+        # A channel can show up twice (e.g. across pages while viewer counts
+        # churn); keep its latest entry. This also keeps the upsert legal, as
+        # Postgres refuses to update one row twice in a single statement.
+        unique_streams = list({stream_data["channel_id"]: stream_data for stream_data in streams}.values())
+        if len(unique_streams) < len(streams):
+            logger.info(f"Dropped {len(streams) - len(unique_streams)} duplicate {platform} streams")
+            streams = unique_streams
+        
+        try:
+            return self._write_streams(platform, streams, collected_at)
+        except IntegrityError:
+            # Most likely a cached channel pk whose row was deleted behind the
+            # collector's back; the cache is already dropped, so one retry
+            # re-resolves every channel
+            logger.warning(f"Stale {platform} channel cache, retrying the save")
+            return self._write_streams(platform, streams, collected_at)
+    
+    def _write_streams(
+        self,
+        platform: str,
+        streams: List[Dict[str, Any]],
+        collected_at: datetime
+    ) -> int:
+        """
+        Upsert channels and insert snapshots for one platform in one transaction.
+        """
+        snapshot_rows = []
+        # Converted once here rather than per row in _snapshot_row
+        collected_at = _db_utc(collected_at)
+        try:
+            with _DB_WRITE_SLOTS, SessionLocal() as db:
+                if engine.dialect.name == "postgresql":
+                    # Snapshots are re-collected every cycle, so don't wait on
+                    # the WAL fsync for this transaction
+                    db.execute(text("SET LOCAL synchronous_commit TO OFF"))
+                channel_pks = self._upsert_channels(db, platform, streams, collected_at)
+                for stream_data in streams:
+                    channel_pk = channel_pks[stream_data["channel_id"]]
+                    snapshot_rows.append(self._snapshot_row(channel_pk, stream_data, collected_at))
+                logger.opt(lazy=True).debug(
+                    "Saving {} streams: {}",
+                    lambda: platform,
+                    lambda: [f"{s['username']} ({s['viewer_count']})" for s in streams]
+                )
+                
+                # Snapshots are insert-only: a Core executemany skips the ORM
+                # unit of work entirely and goes out as one batched INSERT
+                if snapshot_rows:
+                    db.execute(insert(LiveSnapshot), snapshot_rows)
+                    db.commit()
+                
+                self._cycle_metrics[f"{platform}_channels"] = len(channel_pks)
+                self._cycle_metrics[f"{platform}_snapshots"] = len(snapshot_rows)
+        except Exception:
+            # Cached PKs may be stale (e.g. channels were cleared); re-resolve next time
+            self._channel_cache.pop(platform, None)
+            raise
         
-        self.db.add(snapshot)
-        self.db.commit()
-        self.db.refresh(snapshot)
-        return snapshot
+        return len(snapshot_rows)
     
-    async def collect_twitch_streams(self):
+    async def collect_twitch_streams(self, collected_at: Optional[datetime] = None):
         """
         Collect real live streams from Twitch using official API.
+
+        All snapshots from one call share ``collected_at`` (defaults to now).
         """
         logger.info("Starting Twitch stream collection...")
-        collected_count = 0
+        collected_at = collected_at or datetime.now(_UTC)
 
         # Check if we have Twitch API credentials
         if not settings.twitch_client_id or not settings.twitch_client_secret:
@@ -126,99 +328,82 @@ class StreamCollector:
         try:
             # Use the official Twitch API client
             logger.info("Initializing TwitchClient...")
-            async with TwitchClient() as client:
-                logger.info("TwitchClient initialized, fetching streams...")
-                
-                # Get top live streams sorted by viewer count
-                streams_response = await client.get_streams(first=50)
-                streams_data = streams_response.get("data", [])
-                
-                logger.info(f"Received {len(streams_data)} streams from Twitch API")
-                
-                if not streams_data:
-                    logger.error("No live streams returned from Twitch API")
-                    raise ValueError("No live streams available from Twitch API")
-                
-                logger.info(f"Found {len(streams_data)} live streams from Twitch API")
-                logger.info(f"First stream example: {streams_data[0].get('user_login')} - {streams_data[0].get('viewer_count')} viewers")
-                
-                # Get user IDs to fetch follower counts
-                user_ids = [stream["user_id"] for stream in streams_data]
-                logger.info(f"Fetching user info for {len(user_ids)} users...")
-                
-                users_response = await client.get_users(user_ids=user_ids)
-                users_data = {user["id"]: user for user in users_response}
-                logger.info(f"Received info for {len(users_data)} users")
-                
-                twitch_streams = []
-                for stream in streams_data:
-                    user_id = stream["user_id"]
-                    user_data = users_data.get(user_id, {})
-                    
-                    twitch_streams.append({
-                        "channel_id": user_id,
-                        "username": stream["user_login"],
-                        "display_name": stream["user_name"],
-                        "title": stream["title"],
-                        "game_name": stream["game_name"],
-                        "game_id": stream["game_id"],
-                        "viewer_count": stream["viewer_count"],
-                        "language": stream["language"],
-                        "started_at": datetime.fromisoformat(stream["started_at"].replace("Z", "+00:00")),
-                        "thumbnail_url": stream["thumbnail_url"],
-                        "stream_url": f"https://twitch.tv/{stream['user_login']}",
-                        "follower_count": user_data.get("follower_count", 0)
-                    })
+            client = await self._get_twitch_client()
+            logger.info("TwitchClient initialized, fetching streams...")
+            
+            # Get top live streams sorted by viewer count
+            streams_response = await client.get_streams(first=50)
+            streams_data = streams_response.get("data", [])
+            
+            logger.info(f"Received {len(streams_data)} streams from Twitch API")
+            
+            if not streams_data:
+                logger.error("No live streams returned from Twitch API")
+                raise ValueError("No live streams available from Twitch API")
+            
+            logger.info(f"Found {len(streams_data)} live streams from Twitch API")
+            logger.info(f"First stream example: {streams_data[0].get('user_login')} - {streams_data[0].get('viewer_count')} viewers")
+            
+            # Get user IDs to fetch follower counts
+            user_ids = [stream["user_id"] for stream in streams_data]
+            logger.info(f"Fetching user info for {len(user_ids)} users...")
+            
+            users_response = await client.get_users(user_ids=user_ids)
+            # Only the follower count is used, so map straight to it
+            followers_by_id = {user["id"]: user.get("follower_count", 0) for user in users_response}
+            logger.info(f"Received info for {len(followers_by_id)} users")
+            
+            twitch_streams = []
+            for stream in streams_data:
+                user_id = stream["user_id"]
                 
-                logger.info(f"Successfully parsed {len(twitch_streams)} Twitch streams")
+                twitch_streams.append({
+                    "channel_id": user_id,
+                    "username": stream["user_login"],
+                    "display_name": stream["user_name"],
+                    "title": stream["title"],
+                    "game_name": stream["game_name"],
+                    "game_id": stream["game_id"],
+                    "viewer_count": stream["viewer_count"],
+                    "language": stream["language"],
+                    "started_at": datetime.fromisoformat(stream["started_at"]),
+                    "thumbnail_url": stream["thumbnail_url"],
+                    "stream_url": f"https://twitch.tv/{stream['user_login']}",
+                    "follower_count": followers_by_id.get(user_id, 0)
+                })
+            
+            logger.info(f"Successfully parsed {len(twitch_streams)} Twitch streams")
                 
         except Exception as e:
-            logger.error(f"Error fetching real Twitch streams from official API: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error details: {str(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.opt(exception=True).error(f"Error fetching real Twitch streams from official API: {e}")
             # Don't use demo data, just raise the exception
             raise
         
         try:
             logger.info(f"Saving {len(twitch_streams)} Twitch streams to database...")
-            for stream_data in twitch_streams:
-                # Get or create channel
-                channel = self.get_or_create_channel(
-                    platform="twitch",
-                    channel_id=stream_data["channel_id"],
-                    username=stream_data["username"],
-                    display_name=stream_data.get("display_name", stream_data["username"]),
-                    follower_count=stream_data.get("follower_count", 100000 + (collected_count * 2000))
-                )
-                
-                # Create snapshot
-                self.create_snapshot(channel, stream_data)
-                collected_count += 1
-                if collected_count <= 3:  # Log first 3 for debugging
-                    logger.debug(f"Saved: {stream_data['username']} - {stream_data['viewer_count']} viewers")
-                
+            # Blocking DB work runs in a worker thread so the event loop stays free
+            collected_count = await asyncio.to_thread(
+                self._save_streams, "twitch", twitch_streams, collected_at
+            )
             logger.info(f"Successfully collected {collected_count} Twitch stream snapshots")
             
         except Exception as e:
-            logger.error(f"Error saving Twitch data to database: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.opt(exception=True).error(f"Error saving Twitch data to database: {e}")
             raise
 
-    async def collect_kick_streams(self):
+    async def collect_kick_streams(self, collected_at: Optional[datetime] = None):
         """
-        Collect real live streams from Kick using the KickAPI library.
+        Collect real live streams from Kick using the official API.
+
+        All snapshots from one call share ``collected_at`` (defaults to now).
         """
         logger.info("Starting Kick stream collection...")
-        collected_count = 0
+        collected_at = collected_at or datetime.now(_UTC)
 
         try:
             # Try to get real live streams first
             logger.info("Attempting to fetch Kick streams from official API...")
-            real_streams = await self._fetch_real_kick_streams()
+            real_streams = await self._fetch_real_kick_streams(collected_at)
             
             if not real_streams:
                 # Log that we couldn't fetch real streams
@@ -229,37 +414,21 @@ class StreamCollector:
             
             logger.info(f"Processing {len(real_streams)} Kick streams...")
             
-            for stream_data in real_streams:
-                # Get or create channel
-                channel = self.get_or_create_channel(
-                    platform="kick",
-                    channel_id=stream_data["channel_id"],
-                    username=stream_data["username"],
-                    display_name=stream_data.get("display_name", stream_data["username"]),
-                    follower_count=stream_data.get("follower_count", 10000 + (collected_count * 1000))
-                )
-                
-                # Create snapshot
-                self.create_snapshot(channel, stream_data)
-                collected_count += 1
-                if collected_count <= 3:  # Log first 3 for debugging
-                    logger.debug(f"Saved Kick stream: {stream_data['username']}")
-                
+            collected_count = await asyncio.to_thread(
+                self._save_streams, "kick", real_streams, collected_at
+            )
             logger.info(f"Successfully collected {collected_count} Kick stream snapshots")
             
         except Exception as e:
-            logger.error(f"Error collecting Kick data: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.opt(exception=True).error(f"Error collecting Kick data: {e}")
             # Don't raise - allow other platform collection to continue
 
-    async def _fetch_real_kick_streams(self) -> List[Dict[str, Any]]:
+    async def _fetch_real_kick_streams(self, now: datetime) -> List[Dict[str, Any]]:
         """
         Fetch real live streams from Kick using official API.
+
+        ``now`` stands in for ``started_at`` when Kick omits it.
         """
-        from app.collector.kick import KickClient
-        
         # Check if we have Kick API credentials
         if not settings.KICK_CLIENT_ID or not settings.KICK_CLIENT_SECRET:
             logger.warning("Kick API credentials not found in settings")
@@ -272,86 +441,69 @@ class StreamCollector:
         try:
             # Use the official Kick API client
             logger.info("Initializing KickClient...")
-            async with KickClient(
-                client_id=settings.KICK_CLIENT_ID,
-                client_secret=settings.KICK_CLIENT_SECRET
-            ) as client:
-                logger.info("KickClient initialized successfully")
-                logger.info("Fetching live streams from official Kick API...")
-                
-                # Get live streams from the official API
-                livestreams = await client.get_live_streams(limit=50)
-                
-                logger.info(f"Received response from Kick API: {len(livestreams) if livestreams else 0} streams")
-                
-                if not livestreams:
-                    logger.warning("No live streams returned from Kick API")
-                    return []
-                
-                logger.info(f"Found {len(livestreams)} live streams from Kick API")
-                if livestreams:
-                    logger.info(f"First stream structure: {livestreams[0]}")
-                
-                streams = []
-                for i, stream_data in enumerate(livestreams):
-                    try:
-                        # Parse the stream data from official API response
-                        # Kick API returns slug at top level, not in a channel object
-                        channel_slug = stream_data.get("slug")
-                        channel_id = stream_data.get("channel_id")
-                        
-                        if not channel_slug or not channel_id:
-                            logger.warning(f"Stream {i} missing channel slug or ID, skipping. Stream data keys: {stream_data.keys()}")
-                            continue
-                        
-                        # Get follower count if available in stream data
-                        follower_count = stream_data.get("followers_count", 0) or stream_data.get("follower_count", 0)
-                        
-                        # Get category info
-                        category = stream_data.get("category", {}) or {}
-                        game_name = category.get("name", "Just Chatting") if isinstance(category, dict) else "Just Chatting"
-                        game_id = str(category.get("id", "1")) if isinstance(category, dict) else "1"
-                        
-                        streams.append({
-                            "channel_id": str(channel_id),
-                            "username": channel_slug,
-                            "display_name": channel_slug,  # Kick doesn't provide separate display name in this endpoint
-                            "title": stream_data.get("stream_title", f"Live on {channel_slug}"),
-                            "game_name": game_name,
-                            "game_id": game_id,
-                            "viewer_count": stream_data.get("viewer_count", 0),
-                            "language": stream_data.get("language", "en"),
-                            "started_at": datetime.fromisoformat(stream_data["started_at"].replace("Z", "+00:00")) if stream_data.get("started_at") else datetime.utcnow(),
-                            "thumbnail_url": stream_data.get("thumbnail"),
-                            "stream_url": f"https://kick.com/{channel_slug}",
-                            "follower_count": follower_count
-                        })
-                        
-                    except Exception as e:
-                        logger.warning(f"Error parsing stream {i} data: {e}")
-                        logger.warning(f"Stream data: {stream_data}")
+            client = await self._get_kick_client()
+            logger.info("KickClient initialized successfully")
+            logger.info("Fetching live streams from official Kick API...")
+            
+            # Get live streams from the official API
+            livestreams = await client.get_live_streams(limit=50)
+            
+            logger.info(f"Received response from Kick API: {len(livestreams) if livestreams else 0} streams")
+            
+            if not livestreams:
+                logger.warning("No live streams returned from Kick API")
+                return []
+            
+            logger.info(f"Found {len(livestreams)} live streams from Kick API")
+            logger.opt(lazy=True).debug("First stream structure: {}", lambda: livestreams[0])
+            
+            streams = []
+            for i, stream_data in enumerate(livestreams):
+                try:
+                    # Parse the stream data from official API response
+                    # Kick API returns slug at top level, not in a channel object
+                    channel_slug = stream_data.get("slug")
+                    channel_id = stream_data.get("channel_id")
+                    
+                    if not channel_slug or not channel_id:
+                        logger.warning(f"Stream {i} missing channel slug or ID, skipping. Stream data keys: {stream_data.keys()}")
                         continue
-                
-                logger.info(f"Successfully parsed {len(streams)} Kick streams")
-                return streams
-                
-        except Exception as e:
-            logger.error(f"Error fetching real Kick streams from official API: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return []
+                    
+                    # Get follower count if available in stream data
+                    follower_count = stream_data.get("followers_count", 0) or stream_data.get("follower_count", 0)
+                    
+                    # Get category info
+                    category = stream_data.get("category", {}) or {}
+                    game_name = category.get("name", "Just Chatting") if isinstance(category, dict) else "Just Chatting"
+                    game_id = str(category.get("id", "1")) if isinstance(category, dict) else "1"
+                    
+                    streams.append({
+                        "channel_id": str(channel_id),
+                        "username": channel_slug,
+                        "display_name": channel_slug,  # Kick doesn't provide separate display name in this endpoint
+                        "title": stream_data.get("stream_title", f"Live on {channel_slug}"),
+                        "game_name": game_name,
+                        "game_id": game_id,
+                        "viewer_count": stream_data.get("viewer_count", 0),
+                        "language": stream_data.get("language", "en"),
+                        "started_at": datetime.fromisoformat(stream_data["started_at"]) if stream_data.get("started_at") else now,
+                        "thumbnail_url": stream_data.get("thumbnail"),
+                        "stream_url": f"https://kick.com/{channel_slug}",
+                        "follower_count": follower_count
+                    })
+                    
+                except Exception as e:
+                    logger.warning(f"Error parsing stream {i} data: {e}")
+                    logger.warning(f"Stream data: {stream_data}")
+                    continue
+            
+            logger.info(f"Successfully parsed {len(streams)} Kick streams")
+            return streams
                 
         except Exception as e:
-            logger.error(f"Error fetching real Kick streams from official API: {e}")
+            logger.opt(exception=True).error(f"Error fetching real Kick streams from official API: {e}")
             return []
 
-    def _get_demo_kick_streams(self) -> List[Dict[str, Any]]:
-        """
-        Get realistic demo Kick stream data as fallback.
-        """
-        return []
-
     async def run_collection(self):
         """
         Run data collection for all platforms.
@@ -360,15 +512,21 @@ class StreamCollector:
         logger.info("Starting data collection cycle")
         logger.info("=" * 80)
 
-        start_time = datetime.utcnow()
-
-        # Collect from Twitch
-        await self.collect_twitch_streams()
+        start_time = datetime.now(_UTC)
+        self._cycle_metrics.clear()
 
-        # Collect from Kick
-        await self.collect_kick_streams()
+        # Collect from both platforms concurrently; each uses its own session.
+        # Both share one timestamp so a cycle's snapshots line up exactly.
+        results = await asyncio.gather(
+            self.collect_twitch_streams(collected_at=start_time),
+            self.collect_kick_streams(collected_at=start_time),
+            return_exceptions=True
+        )
+        for platform, result in zip(("Twitch", "Kick"), results):
+            if isinstance(result, Exception):
+                logger.error(f"{platform} collection failed: {result}")
 
-        end_time = datetime.utcnow()
+        end_time = datetime.now(_UTC)
         duration = (end_time - start_time).total_seconds()
 
         logger.info("=" * 80)
@@ -378,28 +536,89 @@ class StreamCollector:
     def get_collection_stats(self) -> Dict[str, Any]:
         """
         Get statistics about collected data.
+
+        Table totals are planner estimates on PostgreSQL and MAX(id) on
+        SQLite (rows are only deleted wholesale, so ids stay dense), and
+        the per-platform join is refreshed at most hourly, so this stays
+        cheap to call after every cycle.
         """
         stats = {}
         
-        # Total channels
-        stats["total_channels"] = self.db.query(Channel).count()
-        
-        # Total snapshots
-        stats["total_snapshots"] = self.db.query(LiveSnapshot).count()
+        with SessionLocal() as db:
+            # Total channels / snapshots and latest collection time, one round-trip
+            totals = self._table_totals(db)
+            stats["total_channels"] = totals["channels"]
+            stats["total_snapshots"] = totals["live_snapshots"]
+            
+            # Snapshots by platform
+            now = time.monotonic()
+            if self._platform_counts is None or now - self._platform_counts_at >= PLATFORM_STATS_TTL:
+                platform_counts = db.query(
+                    Channel.platform,
+                    func.count(LiveSnapshot.id)
+                ).join(LiveSnapshot).group_by(Channel.platform).all()
+                self._platform_counts = {platform: count for platform, count in platform_counts}
+                self._platform_counts_at = now
+            
+            stats["snapshots_by_platform"] = self._platform_counts
+            stats["latest_collection"] = totals["latest_collection"]
         
-        # Snapshots by platform
-        platform_counts = self.db.query(
-            Channel.platform,
-            func.count(LiveSnapshot.id)
-        ).join(LiveSnapshot).group_by(Channel.platform).all()
+        # What the most recent cycle wrote, counted in-process
+        stats["last_cycle"] = dict(self._cycle_metrics)
         
-        stats["snapshots_by_platform"] = {platform: count for platform, count in platform_counts}
+        return stats
+    
+    def _table_totals(self, db: Session) -> Dict[str, Any]:
+        """
+        Row counts for channels and live_snapshots plus MAX(collected_at).
+        """
+        if engine.dialect.name == "postgresql":
+            channels, snapshots, latest_collection = db.execute(_PG_TABLE_TOTALS).one()
+            # reltuples is -1 until the table has been analyzed at least once
+            if channels is not None and channels >= 0 and snapshots is not None and snapshots >= 0:
+                return {
+                    "channels": channels,
+                    "live_snapshots": snapshots,
+                    "latest_collection": latest_collection
+                }
         
-        # Latest collection time
-        latest = self.db.query(func.max(LiveSnapshot.collected_at)).scalar()
-        stats["latest_collection"] = latest
+        if engine.dialect.name != "sqlite":
+            channel_total = func.count()
+            snapshot_total = func.count()
+        else:
+            # SQLite keeps no row-count metadata, so COUNT(*) walks the whole
+            # table; MAX on the rowid primary key is a single b-tree seek
+            channel_total = func.max(Channel.id)
+            snapshot_total = func.max(LiveSnapshot.id)
         
-        return stats
+        channels, snapshots, latest_collection = db.execute(
+            select(
+                select(channel_total).select_from(Channel).scalar_subquery(),
+                select(snapshot_total).select_from(LiveSnapshot).scalar_subquery(),
+                select(func.max(LiveSnapshot.collected_at)).scalar_subquery()
+            )
+        ).one()
+        return {
+            "channels": channels or 0,
+            "live_snapshots": snapshots or 0,
+            "latest_collection": latest_collection
+        }
+
+
+# One collection per platform at a time: the background job and every manual
+# trigger share get_collector(), whose clients and channel caches are per platform
+COLLECTION_LOCKS = {"kick": asyncio.Lock(), "twitch": asyncio.Lock()}
+
+
+@lru_cache(maxsize=1)
+def get_collector() -> StreamCollector:
+    """
+    Process-wide StreamCollector, so API clients stay open between runs.
+
+    Closing it with ``aclose()`` only drops the clients; the next
+    collection reopens them.
+    """
+    return StreamCollector()
 
 
 async def run_scheduler():
@@ -414,41 +633,67 @@ async def run_scheduler():
     init_db()
     logger.info("Database initialized successfully")
     
-    collector = StreamCollector()
-    
-    # Run first collection immediately
+    collector = get_collector()
     try:
-        await collector.run_collection()
-    except Exception as e:
-        logger.error(f"Initial collection failed: {e}")
-    
-    # Schedule periodic collections
-    interval_seconds = settings.collection_interval_minutes * 60
-    
-    while True:
+        # Schedule periodic collections against a fixed monotonic grid so the
+        # time spent collecting doesn't push every following cycle back
+        interval_seconds = settings.collection_interval_minutes * 60
+        next_run = time.monotonic()
+        cycle = 0
+        
+        # Run first collection immediately
         try:
-            logger.info(f"Waiting {settings.collection_interval_minutes} minutes until next collection...")
-            await asyncio.sleep(interval_seconds)
-            
             await collector.run_collection()
-            
-            # Log stats
-            stats = collector.get_collection_stats()
-            logger.info(f"Database stats: {stats}")
-            
-        except KeyboardInterrupt:
-            logger.info("Scheduler stopped by user")
-            break
         except Exception as e:
-            logger.error(f"Error in scheduler loop: {e}")
-            # Wait before retrying
-            await asyncio.sleep(60)
+            logger.error(f"Initial collection failed: {e}")
+        
+        while True:
+            try:
+                next_run += interval_seconds
+                now = time.monotonic()
+                if next_run <= now:
+                    # The last cycle ran past its slot; realign to the next
+                    # future slot instead of firing back-to-back to catch up
+                    missed = int((now - next_run) // interval_seconds) + 1
+                    next_run += missed * interval_seconds
+                    logger.warning(f"OVERRUN: collection took longer than the interval, skipped {missed} slot(s)")
+                delay = next_run - now
+                logger.info(f"Waiting {delay:.0f} seconds until next collection...")
+                await asyncio.sleep(delay)
+                
+                await collector.run_collection()
+                
+                # Stats are observational only, so sample them
+                cycle += 1
+                if cycle % max(settings.stats_log_every, 1) == 0:
+                    stats = collector.get_collection_stats()
+                    logger.info(f"Database stats: {stats}")
+                
+            except KeyboardInterrupt:
+                logger.info("Scheduler stopped by user")
+                break
+            except Exception as e:
+                logger.error(f"Error in scheduler loop: {e}")
+                # Wait before retrying
+                await asyncio.sleep(60)
+    finally:
+        await collector.aclose()
 
 
 def main():
     """Entry point for the collector."""
     try:
-        asyncio.run(run_scheduler())
+        # uvloop ships with uvicorn[standard] on Linux/macOS; fall back to asyncio elsewhere
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
+    
+    try:
+        # Passing the loop factory replaces uvloop.install(), which sets a
+        # process-wide event loop policy and is deprecated
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(run_scheduler())
     except KeyboardInterrupt:
         logger.info("Collector shutdown requested")
     except Exception as e:
@@ -1,8 +1,12 @@
 """Twitch API client for collecting live stream data."""
 import asyncio
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Awaitable
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
 from loguru import logger
 from app.config import settings
 
@@ -13,17 +17,50 @@ class TwitchClient:
     BASE_URL = "https://api.twitch.tv/helix"
     AUTH_URL = "https://id.twitch.tv/oauth2/token"
     
+    # Follower counts change slowly, so they are shared across client
+    # instances for up to an hour.
+    FOLLOWER_CACHE_TTL = 3600
+    FOLLOWER_CACHE_MAX = 50_000
+    _follower_cache: Dict[str, Tuple[int, float]] = {}
+    
+    # Helix allows 800 points/minute per app token; stay a little under it
+    RATE_LIMIT_PER_MINUTE = 780
+    # Below this many points left, wait for the bucket to refill
+    RATE_LIMIT_LOW_WATER = 50
+    
+    # App access tokens by client_id, so new client instances skip the OAuth round-trip
+    _token_cache: Dict[str, Tuple[str, datetime, float]] = {}
+    
     def __init__(self):
         self.client_id = settings.twitch_client_id
         self.client_secret = settings.twitch_client_secret
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
+        # time.monotonic() deadline checked before each request; cheaper than datetime math
+        self._token_deadline = 0.0
+        cached_token = self._token_cache.get(self.client_id)
+        # Reused for every request; rebuilt only when the token changes
+        self._headers: Dict[str, str] = {"Client-ID": self.client_id}
+        if cached_token:
+            self.access_token, self.token_expires_at, self._token_deadline = cached_token
+            self._headers["Authorization"] = f"Bearer {self.access_token}"
         self._http_client: Optional[httpx.AsyncClient] = None
+        self._limiter = AsyncLimiter(self.RATE_LIMIT_PER_MINUTE, 60)
+        # Concurrent requests that find the token stale share one OAuth call
+        self._auth_lock = asyncio.Lock()
+        # Epoch seconds of the next bucket refill when we're running low
+        self._ratelimit_reset_at: Optional[float] = None
     
     async def __aenter__(self):
         """Async context manager entry."""
-        self._http_client = httpx.AsyncClient(timeout=30.0)
-        await self.authenticate()
+        # Helix speaks HTTP/2, so concurrent page/follower requests multiplex
+        # over a few connections; ALPN falls back to HTTP/1.1 if needed
+        self._http_client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=128, max_keepalive_connections=64, keepalive_expiry=90)
+        )
+        await self._ensure_authenticated()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -49,13 +86,20 @@ class TwitchClient:
             )
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             self.access_token = data["access_token"]
+            self._headers = {
+                "Client-ID": self.client_id,
+                "Authorization": f"Bearer {self.access_token}"
+            }
             expires_in = data.get("expires_in", 3600)
             
             # Set expiration time with 5-minute buffer
-            from datetime import timedelta
-            self.token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in - 300)
+            self.token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in - 300)
+            self._token_deadline = time.monotonic() + expires_in - 300
+            TwitchClient._token_cache[self.client_id] = (
+                self.access_token, self.token_expires_at, self._token_deadline
+            )
             
             logger.info("Successfully authenticated with Twitch API")
             return self.access_token
@@ -66,15 +110,21 @@ class TwitchClient:
     
     async def _ensure_authenticated(self):
         """Ensure we have a valid access token."""
-        if not self.access_token or (self.token_expires_at and datetime.utcnow() >= self.token_expires_at):
-            await self.authenticate()
+        if not self.access_token or time.monotonic() >= self._token_deadline:
+            async with self._auth_lock:
+                # Another request may have refreshed it while we waited
+                if not self.access_token or time.monotonic() >= self._token_deadline:
+                    await self.authenticate()
+    
+    async def _reauthenticate(self, rejected_token: Optional[str]):
+        """Replace a token Twitch rejected, unless another request already did."""
+        async with self._auth_lock:
+            if self.access_token == rejected_token:
+                await self.authenticate()
     
     def _get_headers(self) -> Dict[str, str]:
         """Get headers for API requests."""
-        return {
-            "Client-ID": self.client_id,
-            "Authorization": f"Bearer {self.access_token}"
-        }
+        return self._headers
     
     async def _make_request(
         self,
@@ -88,26 +138,38 @@ class TwitchClient:
         await self._ensure_authenticated()
         
         url = f"{self.BASE_URL}/{endpoint}"
+        token = self.access_token
         
         try:
-            response = await self._http_client.get(
-                url,
-                headers=self._get_headers(),
-                params=params or {}
-            )
+            async with self._limiter:
+                await self._wait_for_ratelimit_reset()
+                response = await self._http_client.get(
+                    url,
+                    headers=self._get_headers(),
+                    params=params or {}
+                )
+            self._track_ratelimit(response)
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
             
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401 and retries < settings.max_retries:
                 # Token might be expired, re-authenticate
                 logger.warning("Token expired, re-authenticating...")
-                await self.authenticate()
+                await self._reauthenticate(token)
+                return await self._make_request(endpoint, params, retries + 1)
+            elif e.response.status_code == 429 and retries < settings.max_retries:
+                # Rate limited: wait for the bucket reset if Helix told us, else back off with jitter
+                wait_time = min(60, 2 ** retries + random.random())
+                if self._ratelimit_reset_at:
+                    wait_time = min(60, max(0.0, self._ratelimit_reset_at - time.time()) + random.random())
+                logger.warning(f"Rate limited by Twitch, retrying in {wait_time:.1f}s... (attempt {retries + 1})")
+                await asyncio.sleep(wait_time)
                 return await self._make_request(endpoint, params, retries + 1)
             elif retries < settings.max_retries:
-                # Exponential backoff
-                wait_time = settings.retry_backoff_factor ** retries
-                logger.warning(f"Request failed, retrying in {wait_time}s... (attempt {retries + 1})")
+                # Exponential backoff, jittered so parallel failures don't retry in lockstep
+                wait_time = settings.retry_backoff_factor ** retries * (0.5 + random.random())
+                logger.warning(f"Request failed, retrying in {wait_time:.1f}s... (attempt {retries + 1})")
                 await asyncio.sleep(wait_time)
                 return await self._make_request(endpoint, params, retries + 1)
             else:
@@ -117,6 +179,27 @@ class TwitchClient:
             logger.error(f"Unexpected error making request to {endpoint}: {e}")
             raise
     
+    def _track_ratelimit(self, response: httpx.Response):
+        """Remember when the rate-limit bucket refills if we're close to empty."""
+        remaining = response.headers.get("Ratelimit-Remaining")
+        reset = response.headers.get("Ratelimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            low = int(remaining) < self.RATE_LIMIT_LOW_WATER or response.status_code == 429
+            self._ratelimit_reset_at = float(reset) if low else None
+        except ValueError:
+            self._ratelimit_reset_at = None
+    
+    async def _wait_for_ratelimit_reset(self):
+        """Sleep until the bucket refills if the last response said it was nearly empty."""
+        if self._ratelimit_reset_at:
+            delay = self._ratelimit_reset_at - time.time()
+            if delay > 0:
+                logger.debug("Twitch rate limit nearly exhausted, waiting {:.1f}s", delay)
+                await asyncio.sleep(min(delay, 60))
+            self._ratelimit_reset_at = None
+    
     async def get_streams(
         self,
         first: int = 100,
@@ -147,6 +230,69 @@ class TwitchClient:
         
         return await self._make_request("streams", params)
     
+    async def iter_streams(
+        self,
+        max_results: int = 1000,
+        game_id: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield live streams one page (up to 100) at a time.
+        
+        Lets callers process each page as it arrives instead of holding
+        every stream in memory at once.
+        
+        Helix pages are cursor-linked, so they cannot be fetched in
+        parallel; instead the next page is requested as soon as the
+        current cursor is known, overlapping that round-trip with the
+        caller's processing of the current page. Callers that may stop
+        early should wrap the iterator in ``contextlib.aclosing`` so the
+        in-flight request is cancelled before the client closes.
+        
+        Args:
+            max_results: Maximum number of streams to fetch
+            game_id: Filter by game ID
+            language: Filter by language
+            
+        Yields:
+            Lists of stream objects
+        """
+        if max_results <= 0:
+            return
+        
+        fetched = 0
+        next_page = asyncio.create_task(self.get_streams(
+            first=min(100, max_results),
+            game_id=game_id,
+            language=language
+        ))
+        
+        try:
+            while next_page is not None:
+                result = await next_page
+                next_page = None
+                
+                streams = result.get("data", [])
+                if not streams:
+                    break
+                
+                fetched += len(streams)
+                cursor = result.get("pagination", {}).get("cursor")
+                if cursor and fetched < max_results:
+                    next_page = asyncio.create_task(self.get_streams(
+                        first=min(100, max_results - fetched),
+                        after=cursor,
+                        game_id=game_id,
+                        language=language
+                    ))
+                
+                logger.info(f"Fetched {fetched} streams so far...")
+                yield streams
+        finally:
+            # Caller stopped early or a request failed: drop the in-flight page
+            if next_page is not None:
+                next_page.cancel()
+    
     async def get_all_streams(
         self,
         max_results: int = 1000,
@@ -165,33 +311,8 @@ class TwitchClient:
             List of stream objects
         """
         all_streams = []
-        cursor = None
-        
-        while len(all_streams) < max_results:
-            remaining = max_results - len(all_streams)
-            batch_size = min(100, remaining)
-            
-            result = await self.get_streams(
-                first=batch_size,
-                after=cursor,
-                game_id=game_id,
-                language=language
-            )
-            
-            streams = result.get("data", [])
-            if not streams:
-                break
-            
+        async for streams in self.iter_streams(max_results, game_id, language):
             all_streams.extend(streams)
-            
-            # Check if there's more data
-            pagination = result.get("pagination", {})
-            cursor = pagination.get("cursor")
-            
-            if not cursor:
-                break
-            
-            logger.info(f"Fetched {len(all_streams)} streams so far...")
         
         logger.info(f"Total streams fetched: {len(all_streams)}")
         return all_streams
@@ -200,40 +321,29 @@ class TwitchClient:
         """
         Get user information.
         
+        Helix accepts at most 100 IDs or logins per call; larger lists are
+        de-duplicated and split into 100-item requests that run concurrently.
+        
         Args:
-            user_ids: List of user IDs (max 100)
-            logins: List of usernames (max 100)
+            user_ids: List of user IDs
+            logins: List of usernames
             
         Returns:
             List of user objects with follower counts
         """
-        params = {}
+        results = await asyncio.gather(*self._batched_requests("users", id=user_ids, login=logins))
+        users = [user for result in results for user in result.get("data", [])]
         
-        if user_ids:
-            params["id"] = user_ids[:100]
-        if logins:
-            params["login"] = logins[:100]
+        # Get follower counts for all users at once
+        follower_counts = await self.get_follower_counts_batch([user.get("id") for user in users])
         
-        result = await self._make_request("users", params)
-        users = result.get("data", [])
-        
-        # Get follower counts for each user
         users_with_followers = []
         for user in users:
-            user_id = user.get("id")
-            # Get follower count using the follows endpoint
-            try:
-                follows_result = await self._make_request("channels/followers", {"broadcaster_id": user_id})
-                follower_count = follows_result.get("total", 0)
-            except Exception as e:
-                logger.warning(f"Could not fetch follower count for {user.get('login')}: {e}")
-                follower_count = 0
-            
             users_with_followers.append({
                 "id": user.get("id"),
                 "login": user.get("login"),
                 "display_name": user.get("display_name"),
-                "follower_count": follower_count
+                "follower_count": follower_counts.get(user.get("id"), 0)
             })
         
         return users_with_followers
@@ -242,22 +352,28 @@ class TwitchClient:
         """
         Get game information.
         
+        Lists longer than 100 are split into concurrent requests, as in
+        ``get_users``.
+        
         Args:
-            game_ids: List of game IDs (max 100)
-            names: List of game names (max 100)
+            game_ids: List of game IDs
+            names: List of game names
             
         Returns:
             List of game objects
         """
-        params = {}
-        
-        if game_ids:
-            params["id"] = game_ids[:100]
-        if names:
-            params["name"] = names[:100]
-        
-        result = await self._make_request("games", params)
-        return result.get("data", [])
+        results = await asyncio.gather(*self._batched_requests("games", id=game_ids, name=names))
+        return [game for result in results for game in result.get("data", [])]
+    
+    def _batched_requests(self, endpoint: str, **lookups: Optional[List[str]]) -> List[Awaitable[Dict[str, Any]]]:
+        """Build one request per 100 distinct values of each lookup parameter."""
+        requests = []
+        for key, values in lookups.items():
+            # Repeat streamers/games across pages would otherwise be re-queried
+            values = list(dict.fromkeys(values or ()))
+            for i in range(0, len(values), 100):
+                requests.append(self._make_request(endpoint, {key: values[i:i + 100]}))
+        return requests
     
     async def get_top_games(self, first: int = 100, after: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -336,6 +452,62 @@ class TwitchClient:
         result = await self._make_request(endpoint, params)
         return result.get("total", 0)
     
+    async def get_follower_counts_batch(
+        self,
+        user_ids: List[str],
+        concurrency: int = 8
+    ) -> Dict[str, int]:
+        """
+        Get follower counts for many channels.
+        
+        Helix only reports followers for one broadcaster per request, so
+        uncached IDs are fetched concurrently (bounded by ``concurrency``).
+        
+        Args:
+            user_ids: Broadcaster IDs to look up
+            concurrency: Maximum number of requests in flight
+            
+        Returns:
+            Dictionary mapping broadcaster ID to follower count (0 if unavailable)
+        """
+        cache = TwitchClient._follower_cache
+        now = time.monotonic()
+        counts = {}
+        missing = []
+        
+        for user_id in dict.fromkeys(user_ids):
+            cached = cache.get(user_id)
+            if cached and now - cached[1] < self.FOLLOWER_CACHE_TTL:
+                counts[user_id] = cached[0]
+            else:
+                missing.append(user_id)
+        
+        if not missing:
+            return counts
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def fetch(user_id: str) -> Tuple[str, Optional[int]]:
+            async with semaphore:
+                try:
+                    return user_id, await self.get_follower_count(user_id)
+                except Exception as e:
+                    logger.warning(f"Could not fetch follower count for {user_id}: {e}")
+                    return user_id, None
+        
+        if len(cache) > self.FOLLOWER_CACHE_MAX:
+            cache.clear()
+        
+        for user_id, follower_count in await asyncio.gather(*(fetch(user_id) for user_id in missing)):
+            if follower_count is None:
+                counts[user_id] = 0
+            else:
+                counts[user_id] = follower_count
+                cache[user_id] = (follower_count, now)
+        
+        logger.debug("Follower counts: {} fetched, {} cached", len(missing), len(counts) - len(missing))
+        return counts
+    
     @staticmethod
     def parse_stream_data(stream: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -356,7 +528,7 @@ class TwitchClient:
             "game_name": stream.get("game_name"),
             "viewer_count": stream.get("viewer_count", 0),
             "language": stream.get("language"),
-            "started_at": datetime.fromisoformat(stream.get("started_at", "").replace("Z", "+00:00"))
+            "started_at": datetime.fromisoformat(stream["started_at"])
             if stream.get("started_at") else None,
             "thumbnail_url": stream.get("thumbnail_url", "").replace("{width}", "1920").replace("{height}", "1080"),
             "stream_url": f"https://www.twitch.tv/{stream.get('user_login')}"
@@ -34,6 +34,7 @@ class Settings(BaseSettings):
     # Collector Settings
     collection_interval_minutes: int = 2
     max_streams_per_collection: int = 100
+    stats_log_every: int = 10  # log database stats every N collection cycles
     
     # Retry Settings
     max_retries: int = 3
@@ -1,6 +1,6 @@
 """Database connection and session management."""
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
@@ -14,6 +14,20 @@ if os.getenv("ENVIRONMENT") == "production":
         connect_args={"check_same_thread": False},
         echo=False
     )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL lets API reads run during collector writes and fsyncs only at checkpoints."""
+        cursor = dbapi_connection.cursor()
+        # Off by default in SQLite; without it a snapshot pointing at a
+        # deleted channel is silently accepted
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+        cursor.close()
 else:
     # PostgreSQL for local development
     engine = create_engine(
@@ -21,15 +35,24 @@ else:
         pool_pre_ping=True,
         pool_size=10,
         max_overflow=20,
+        pool_recycle=1800,  # recycle before server/proxy idle timeouts drop connections
         echo=False
     )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory. Nothing reuses ORM objects across a commit, so
+# skip expiring them (and the re-SELECT on next attribute access)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
 
+# Indexes the models no longer declare; init_db drops them from existing databases
+RETIRED_INDEXES = (
+    "idx_game_collected",  # superseded by idx_game_collected_viewers
+    "idx_collected_at_desc",  # B-trees scan either way; idx_collected_at serves it
+    "ix_live_snapshots_collected_at",  # index=True duplicate of idx_collected_at
+)
+
 
 def get_db():
     """Dependency for getting database session."""
@@ -44,3 +67,12 @@ def init_db():
     """Initialize database tables."""
     from app.models import Channel, LiveSnapshot  # Import models
     Base.metadata.create_all(bind=engine)
+
+    # create_all skips tables that already exist, indexes included, so
+    # bring indexes on existing databases in line with the models here
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
@@ -1,30 +1,39 @@
 """Main FastAPI application."""
-from datetime import datetime
-from fastapi import FastAPI, Depends, BackgroundTasks
+from datetime import datetime, timezone
+from fastapi import FastAPI, Depends, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from sqlalchemy.orm import Session
 from loguru import logger
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import os
 import asyncio
+import time
 
 from app.config import settings
 from app.database import get_db, init_db
-from app.api.routes import router as api_router
+from app.api.routes import router as api_router, etag_matches, invalidate_category_stats_cache
 from app.schemas import HealthResponse
-from app.collector.scheduler import StreamCollector
+from app.collector.scheduler import get_collector, COLLECTION_LOCKS
 
 # Initialize database on startup
 init_db()
 
+BACKGROUND_COLLECTION_INTERVAL = 120  # seconds
+HEALTH_CHECK_TTL = 1.0  # seconds a database ping result is reused for
+
+# Last database ping, so bursts of health probes share one SELECT 1
+_health_cache = {"checked_at": float("-inf"), "database": "unknown"}
+
 # Create FastAPI app
 app = FastAPI(
     title="Live Streaming Data Collection API",
     description="Collect and analyze live streaming data from Twitch and Kick",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -44,25 +53,41 @@ static_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
 if os.path.exists(static_path):
     app.mount("/static", StaticFiles(directory=static_path), name="static")
 
+# Resolved once at import; the dashboard ships with the image, so it can't appear later
+DASHBOARD_FILE = os.path.join(static_path, "index.html")
+DASHBOARD_EXISTS = os.path.exists(DASHBOARD_FILE)
+# Only changes on deploy; clients revalidate against the file's ETag afterwards
+DASHBOARD_HEADERS = {"Cache-Control": "public, max-age=300"}
+
+
+def _dashboard_response(request: Request) -> Response:
+    """
+    Serve the dashboard HTML, or a 304 when the client's copy is current.
+
+    FileResponse sets ETag/Last-Modified but never evaluates If-None-Match
+    itself, so that is done here against the ETag it computed.
+    """
+    response = FileResponse(DASHBOARD_FILE, headers=DASHBOARD_HEADERS, stat_result=os.stat(DASHBOARD_FILE))
+    etag = response.headers["etag"]
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, **DASHBOARD_HEADERS})
+    return response
+
 
 @app.get("/dashboard", tags=["dashboard"])
-async def dashboard():
+async def dashboard(request: Request):
     """Serve the dashboard HTML."""
-    static_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
-    dashboard_file = os.path.join(static_path, "index.html")
-    if os.path.exists(dashboard_file):
-        return FileResponse(dashboard_file)
+    if DASHBOARD_EXISTS:
+        return _dashboard_response(request)
     else:
         return {"error": "Dashboard not found", "static_path": static_path}
 
 
 @app.get("/", tags=["root"])
-async def root():
+async def root(request: Request):
     """Root endpoint - redirect to dashboard."""
-    static_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
-    dashboard_file = os.path.join(static_path, "index.html")
-    if os.path.exists(dashboard_file):
-        return FileResponse(dashboard_file)
+    if DASHBOARD_EXISTS:
+        return _dashboard_response(request)
     else:
         return {
             "message": "Live Streaming Data Collection API",
@@ -76,14 +101,20 @@ async def root():
 @app.get("/health", response_model=HealthResponse, tags=["health"])
 async def health_check(db: Session = Depends(get_db)):
     """Health check endpoint."""
-    try:
-        # Test database connection
-        from sqlalchemy import text
-        db.execute(text("SELECT 1"))
-        db_status = "healthy"
-    except Exception as e:
-        logger.error(f"Database health check failed: {e}")
-        db_status = "unhealthy"
+    now = time.monotonic()
+    if now - _health_cache["checked_at"] >= HEALTH_CHECK_TTL:
+        try:
+            # Test database connection
+            from sqlalchemy import text
+            db.execute(text("SELECT 1"))
+            db_status = "healthy"
+        except Exception as e:
+            logger.error(f"Database health check failed: {e}")
+            db_status = "unhealthy"
+        _health_cache["checked_at"] = now
+        _health_cache["database"] = db_status
+    else:
+        db_status = _health_cache["database"]
     
     return HealthResponse(
         status="healthy" if db_status == "healthy" else "degraded",
@@ -115,42 +146,46 @@ async def trigger_twitch_collection(background_tasks: BackgroundTasks):
 
 async def collect_kick_data():
     """Collect data from Kick platform."""
-    try:
-        logger.info("Starting Kick data collection...")
-        collector = StreamCollector()
-        await collector.collect_kick_streams()
-        logger.info("Kick data collection completed")
-    except Exception as e:
-        logger.error(f"Error during Kick data collection: {e}")
+    lock = COLLECTION_LOCKS["kick"]
+    if lock.locked():
+        logger.info("Kick collection already in progress, waiting for it to finish...")
+    async with lock:
+        try:
+            logger.info("Starting Kick data collection...")
+            await get_collector().collect_kick_streams()
+            logger.info("Kick data collection completed")
+        except Exception as e:
+            logger.error(f"Error during Kick data collection: {e}")
+        # Even a failed run may have committed some of its batches
+        invalidate_category_stats_cache("kick")
 
 
 async def collect_twitch_data():
     """Collect data from Twitch platform."""
-    try:
-        logger.info("Starting Twitch data collection...")
-        collector = StreamCollector()
-        await collector.collect_twitch_streams()
-        logger.info("Twitch data collection completed")
-    except Exception as e:
-        logger.error(f"Error during Twitch data collection: {e}")
+    lock = COLLECTION_LOCKS["twitch"]
+    if lock.locked():
+        logger.info("Twitch collection already in progress, waiting for it to finish...")
+    async with lock:
+        try:
+            logger.info("Starting Twitch data collection...")
+            await get_collector().collect_twitch_streams()
+            logger.info("Twitch data collection completed")
+        except Exception as e:
+            logger.error(f"Error during Twitch data collection: {e}")
+        # Even a failed run may have committed some of its batches
+        invalidate_category_stats_cache("twitch")
 
 
 async def collect_all_data():
     """Collect data from both platforms."""
-    await collect_kick_data()
-    await collect_twitch_data()
+    # Independent APIs and DB transactions, so a slow platform doesn't hold up the other
+    await asyncio.gather(collect_kick_data(), collect_twitch_data(), return_exceptions=True)
 
 
-# Background task to collect data periodically
-async def start_background_tasks():
-    """Start background data collection tasks."""
-    while True:
-        try:
-            await collect_all_data()
-            await asyncio.sleep(120)  # Collect every 2 minutes
-        except Exception as e:
-            logger.error(f"Background task error: {e}")
-            await asyncio.sleep(60)  # Wait 1 minute before retrying
+async def scheduled_collection():
+    """Interval job body; records its task so shutdown can wait for it."""
+    app.state.scheduled_run = asyncio.current_task()
+    await collect_all_data()
 
 
 @app.on_event("startup")
@@ -160,14 +195,44 @@ async def startup_event():
     logger.info(f"API version: 1.0.0")
     logger.info(f"Database URL: {settings.database_url.split('@')[-1]}")  # Hide credentials
     
-    # Start background data collection
-    asyncio.create_task(start_background_tasks())
+    # Periodic collection: first run now, then every interval. max_instances=1
+    # skips a tick rather than overlapping a run that is still going, and
+    # coalesce collapses missed ticks into one
+    scheduler = AsyncIOScheduler(timezone="UTC")
+    scheduler.add_job(
+        scheduled_collection,
+        "interval",
+        seconds=BACKGROUND_COLLECTION_INTERVAL,
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now(timezone.utc)
+    )
+    scheduler.start()
+    app.state.scheduler = scheduler
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown."""
     logger.info("Shutting down Live Streaming Data Collection API")
+    
+    scheduler = getattr(app.state, "scheduler", None)
+    if scheduler is not None:
+        # Stop new runs and let a running one finish: shutdown() would cancel
+        # it while its database writes carry on in a worker thread
+        scheduler.pause()
+        scheduled_run = getattr(app.state, "scheduled_run", None)
+        if scheduled_run is not None and not scheduled_run.done():
+            logger.info("Waiting for the running collection to finish...")
+            await asyncio.wait({scheduled_run})
+    
+    # Holding both platform locks also waits out manual collections before
+    # the clients are closed underneath them
+    async with COLLECTION_LOCKS["kick"], COLLECTION_LOCKS["twitch"]:
+        await get_collector().aclose()
+    
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
 
 
 if __name__ == "__main__":
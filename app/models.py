@@ -1,10 +1,30 @@
 """SQLAlchemy database models."""
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, BigInteger, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql.expression import FunctionElement
 from app.database import Base
 
 
+class utcnow(FunctionElement):
+    """Current time as naive UTC, matching what the app writes to these columns."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # now() follows the session time zone; the columns are timestamp without time zone
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
 class Channel(Base):
     """Channel/streamer information table."""
     
@@ -15,11 +35,14 @@ class Channel(Base):
     channel_id = Column(String(100), nullable=False, index=True)  # Platform-specific ID
     username = Column(String(100), nullable=False, index=True)
     display_name = Column(String(100))
-    description = Column(Text)
-    profile_image_url = Column(String(500))
+    # Only the channel detail view reads these; list queries skip loading them
+    description = deferred(Column(Text), group="profile")
+    profile_image_url = deferred(Column(String(500)), group="profile")
     follower_count = Column(BigInteger, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # server_default stamps rows written outside the ORM/collector; the Python
+    # defaults stay for databases created before the server defaults existed
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=utcnow())
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=utcnow())
     
     # Relationship to snapshots
     snapshots = relationship("LiveSnapshot", back_populates="channel", cascade="all, delete-orphan")
@@ -50,7 +73,9 @@ class LiveSnapshot(Base):
     
     # Timestamps
     started_at = Column(DateTime)
-    collected_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Indexed by idx_collected_at below; a second single-column index
+    # would only add write cost to every snapshot insert
+    collected_at = Column(DateTime, default=datetime.utcnow, server_default=utcnow())
     
     # URLs
     thumbnail_url = Column(String(500))
@@ -62,7 +87,9 @@ class LiveSnapshot(Base):
     # Indexes for common queries
     __table_args__ = (
         Index('idx_collected_at', 'collected_at'),
-        Index('idx_game_collected', 'game_name', 'collected_at'),
+        # Covers the category stats aggregate (join key and viewer_count
+        # included) so it runs as an index-only scan
+        Index('idx_game_collected_viewers', 'game_name', 'collected_at', 'viewer_count', 'channel_id'),
         Index('idx_channel_collected', 'channel_id', 'collected_at'),
     )
     
@@ -0,0 +1 @@
+"""Test suite for the streaming data collector and API."""
@@ -0,0 +1,68 @@
+"""
+Shared fixtures.
+
+The app binds its engine at import time, choosing SQLite when
+ENVIRONMENT=production, with the database file (and the collector's log
+directory) relative to the working directory. Both are pointed at a scratch
+directory before anything from ``app`` is imported.
+"""
+import os
+import tempfile
+
+os.environ["ENVIRONMENT"] = "production"
+os.chdir(tempfile.mkdtemp(prefix="streaming-tests-"))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.routes as routes
+from app.collector.scheduler import get_collector
+from app.database import Base, SessionLocal, engine
+from app.main import app as fastapi_app
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Fresh tables and empty in-process caches for every test."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    get_collector().invalidate_channel_cache()
+    routes._category_stats_cache.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    """A session on the test database."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    """API client; startup events (and so the background scheduler) are not run."""
+    return TestClient(fastapi_app)
+
+
+@pytest.fixture
+def collector():
+    """The process-wide collector the API and scheduler share."""
+    return get_collector()
+
+
+def make_stream(channel_id: str, username: str = None, **fields) -> dict:
+    """Parsed stream data as the platform clients produce it."""
+    stream = {
+        "channel_id": channel_id,
+        "username": username or channel_id,
+        "title": f"{channel_id} live",
+        "game_name": "Just Chatting",
+        "viewer_count": 10,
+        "language": "en",
+        "follower_count": 0,
+    }
+    stream.update(fields)
+    return stream
@@ -0,0 +1,191 @@
+"""Tests for API caching headers, cached stats and the streamed channel history."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.requests import Request
+
+import app.api.routes as routes
+from app.api.routes import etag_matches
+from app.main import DASHBOARD_EXISTS, collect_kick_data
+from app.models import Channel, LiveSnapshot
+from app.schemas import ChannelHistoryResponse
+from tests.conftest import make_stream
+
+
+def _add_snapshots(db, username, viewer_counts, collected_at=None, platform="kick"):
+    """One channel with a snapshot per viewer count, a minute apart, newest first."""
+    collected_at = collected_at or datetime.utcnow()
+    channel = Channel(platform=platform, channel_id=f"id-{username}", username=username, follower_count=1)
+    db.add(channel)
+    db.flush()
+    for minutes, viewer_count in enumerate(viewer_counts):
+        db.add(LiveSnapshot(
+            channel_id=channel.id,
+            viewer_count=viewer_count,
+            collected_at=collected_at - timedelta(minutes=minutes)
+        ))
+    db.commit()
+    return channel
+
+
+def _request(if_none_match):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ('"x",W/"abc"', True),
+    ("*", True),
+    ('"ab"', False),
+    ('"abcd"', False),
+    ('"x", "y"', False),
+    ("", False),
+    (None, False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(_request(header), '"abc"') is expected
+
+
+@pytest.mark.parametrize("path", ["/api/live/top?platform=kick", "/api/streams?platform=kick"])
+def test_live_list_conditional_get(client, db, path):
+    _add_snapshots(db, "alice", [10])
+    
+    first = client.get(path)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == routes.LIST_CACHE_CONTROL
+    
+    repeat = client.get(path, headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert repeat.headers["etag"] == etag
+    
+    assert client.get(path, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": etag[:-2] + '"'}).status_code == 200
+    # Another representation of the list carries another tag
+    assert client.get(path + "&limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_live_list_etag_changes_on_new_collection(client, db):
+    _add_snapshots(db, "alice", [10], collected_at=datetime.utcnow() - timedelta(minutes=5))
+    etag = client.get("/api/live/top?platform=kick").headers["etag"]
+    
+    _add_snapshots(db, "bob", [20])
+    
+    response = client.get("/api/live/top?platform=kick", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [stream["username"] for stream in response.json()] == ["bob", "alice"]
+
+
+def test_live_list_etag_changes_when_snapshots_age_out(client, db, monkeypatch):
+    _add_snapshots(db, "alice", [10])
+    _add_snapshots(db, "bob", [20], collected_at=datetime.utcnow() - timedelta(minutes=30))
+    etag = client.get("/api/live/top?platform=kick").headers["etag"]
+    
+    # Nothing new is collected, but bob's snapshot leaves the live window
+    monkeypatch.setattr(routes, "LIVE_WINDOW", timedelta(minutes=10))
+    
+    response = client.get("/api/live/top?platform=kick", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [stream["username"] for stream in response.json()] == ["alice"]
+
+
+def test_live_list_etag_ignores_other_platforms(client, db):
+    _add_snapshots(db, "alice", [10], collected_at=datetime.utcnow() - timedelta(minutes=5))
+    etag = client.get("/api/live/top?platform=kick").headers["etag"]
+    
+    _add_snapshots(db, "bob", [20], platform="twitch")
+    
+    response = client.get("/api/live/top?platform=kick", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_streams_database_error_returns_message(client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(routes, "_not_modified", broken)
+    
+    response = client.get("/api/streams?platform=kick")
+    assert response.status_code == 200
+    assert response.json()["streams"] == []
+    assert "message" in response.json()
+    assert "etag" not in response.headers
+
+
+@pytest.mark.skipif(not DASHBOARD_EXISTS, reason="static/index.html not present")
+@pytest.mark.parametrize("path", ["/", "/dashboard"])
+def test_dashboard_conditional_get(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=300"
+    
+    repeat = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+
+
+def _category_totals(client):
+    stats = client.get("/api/stats/categories?platform=kick&window=24h").json()
+    return {row["game_name"]: row["total_streams"] for row in stats}
+
+
+def test_collection_refreshes_category_stats(client, collector, monkeypatch):
+    collector._save_streams("kick", [make_stream("a", "alice")], datetime.now(timezone.utc))
+    assert _category_totals(client) == {"Just Chatting": 1}
+    
+    async def collect_kick_streams():
+        collector._save_streams("kick", [make_stream("b", "bob")], datetime.now(timezone.utc))
+    
+    monkeypatch.setattr(collector, "collect_kick_streams", collect_kick_streams)
+    asyncio.run(collect_kick_data())
+    
+    assert _category_totals(client) == {"Just Chatting": 2}
+
+
+def test_clear_data_empties_category_stats(client, collector):
+    collector._save_streams("kick", [make_stream("a", "alice")], datetime.now(timezone.utc))
+    assert _category_totals(client) == {"Just Chatting": 1}
+    
+    assert client.post("/api/clear-data").json()["status"] == "success"
+    
+    assert _category_totals(client) == {}
+
+
+
+def test_channel_history_streams_valid_json(client, db, monkeypatch):
+    # Several partitions, including a partial last one
+    monkeypatch.setattr(routes, "HISTORY_BATCH_SIZE", 2)
+    _add_snapshots(db, "alice", [10, 40, 20, 30, 50])
+    _add_snapshots(db, "alice_old", [999], collected_at=datetime.utcnow() - timedelta(days=3))
+    
+    response = client.get("/api/channel/kick/alice/history?window=24h")
+    
+    assert response.status_code == 200
+    history = ChannelHistoryResponse.model_validate_json(response.content)
+    assert history.channel.username == "alice"
+    assert [snapshot.viewer_count for snapshot in history.snapshots] == [50, 30, 20, 40, 10]
+    assert history.total_snapshots == 5
+    assert history.avg_viewer_count == 30.0
+    assert history.peak_viewer_count == 50
+
+
+def test_channel_history_respects_window(client, db):
+    _add_snapshots(db, "alice", [10], collected_at=datetime.utcnow() - timedelta(days=3))
+    
+    history = ChannelHistoryResponse.model_validate_json(
+        client.get("/api/channel/kick/alice/history?window=24h").content
+    )
+    
+    assert history.snapshots == []
+    assert history.total_snapshots == 0
+    assert history.avg_viewer_count == 0.0
+    assert history.peak_viewer_count == 0
+
+
+def test_channel_history_unknown_channel(client):
+    assert client.get("/api/channel/kick/nobody/history").status_code == 404
@@ -0,0 +1,271 @@
+"""Tests for persisting collected streams and for the Twitch API client."""
+import asyncio
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import orjson
+import pytest
+
+from app.collector.twitch import TwitchClient
+from app.config import settings
+from app.models import Channel, LiveSnapshot
+from tests.conftest import make_stream
+
+
+def _snapshot_owners(db):
+    """(channel username, viewer_count) for every snapshot, via the FK."""
+    return sorted(
+        (channel.username, snapshot.viewer_count)
+        for snapshot, channel in db.query(LiveSnapshot, Channel).join(Channel)
+    )
+
+
+def test_save_streams_creates_channels_and_snapshots(collector, db):
+    saved = collector._save_streams(
+        "kick",
+        [make_stream("1", "alice", viewer_count=5), make_stream("2", "bob", viewer_count=7)],
+        datetime.now(timezone.utc)
+    )
+    
+    assert saved == 2
+    assert db.query(Channel).count() == 2
+    assert _snapshot_owners(db) == [("alice", 5), ("bob", 7)]
+
+
+def test_save_streams_updates_existing_channels(collector, db):
+    collector._save_streams("kick", [make_stream("1", "alice", follower_count=100)], datetime.now(timezone.utc))
+    collector._save_streams(
+        "kick",
+        [make_stream("1", "alice_renamed", follower_count=150)],
+        datetime.now(timezone.utc)
+    )
+    
+    channel = db.query(Channel).one()
+    assert channel.username == "alice_renamed"
+    assert channel.follower_count == 150
+    assert db.query(LiveSnapshot).count() == 2
+
+
+def test_zero_follower_count_keeps_known_value(collector, db):
+    collector._save_streams("twitch", [make_stream("1", follower_count=100)], datetime.now(timezone.utc))
+    # Served from the channel cache
+    collector._save_streams("twitch", [make_stream("1", follower_count=0)], datetime.now(timezone.utc))
+    collector.invalidate_channel_cache()
+    # Goes through the upsert
+    collector._save_streams("twitch", [make_stream("1", follower_count=0)], datetime.now(timezone.utc))
+    
+    assert db.query(Channel).one().follower_count == 100
+
+
+def test_duplicate_streams_keep_latest_entry(collector, db):
+    saved = collector._save_streams(
+        "kick",
+        [make_stream("1", viewer_count=5), make_stream("1", viewer_count=9)],
+        datetime.now(timezone.utc)
+    )
+    
+    assert saved == 1
+    assert db.query(LiveSnapshot).one().viewer_count == 9
+
+
+def test_save_after_clear_data_recreates_channels(collector, client, db):
+    collector._save_streams(
+        "kick",
+        [make_stream("a", "alice", viewer_count=1), make_stream("b", "bob", viewer_count=2)],
+        datetime.now(timezone.utc)
+    )
+    
+    assert client.post("/api/clear-data").json()["status"] == "success"
+    
+    collector._save_streams(
+        "kick",
+        [
+            make_stream("z", "zed", viewer_count=3),
+            make_stream("a", "alice", viewer_count=4),
+            make_stream("b", "bob", viewer_count=5)
+        ],
+        datetime.now(timezone.utc)
+    )
+    
+    assert sorted(channel.username for channel in db.query(Channel)) == ["alice", "bob", "zed"]
+    # Every snapshot belongs to the channel it was collected for
+    assert _snapshot_owners(db) == [("alice", 4), ("bob", 5), ("zed", 3)]
+
+
+def test_save_recovers_from_channels_deleted_behind_the_cache(collector, db):
+    collector._save_streams("kick", [make_stream("a", "alice")], datetime.now(timezone.utc))
+    # Deleted without going through clear-data, so the cache isn't told
+    db.query(LiveSnapshot).delete()
+    db.query(Channel).delete()
+    db.commit()
+    
+    saved = collector._save_streams("kick", [make_stream("a", "alice", viewer_count=8)], datetime.now(timezone.utc))
+    
+    assert saved == 1
+    assert _snapshot_owners(db) == [("alice", 8)]
+
+
+def test_timestamps_are_stored_as_naive_utc(collector, db):
+    collected_at = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    started_at = datetime(2026, 3, 1, 13, 0, tzinfo=timezone(timedelta(hours=2)))
+    collector._save_streams("twitch", [make_stream("1", started_at=started_at)], collected_at)
+    
+    snapshot = db.query(LiveSnapshot).one()
+    channel = db.query(Channel).one()
+    assert snapshot.collected_at == datetime(2026, 3, 1, 12, 0)
+    assert snapshot.started_at == datetime(2026, 3, 1, 11, 0)
+    assert channel.updated_at == datetime(2026, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def twitch_settings(monkeypatch):
+    """Fake credentials and an empty token cache shared by TwitchClient instances."""
+    monkeypatch.setattr(settings, "twitch_client_id", "test-client")
+    monkeypatch.setattr(settings, "twitch_client_secret", "test-secret")
+    monkeypatch.setattr(TwitchClient, "_token_cache", {})
+
+
+def _twitch_client(handler):
+    """A TwitchClient whose requests go to ``handler`` instead of the network."""
+    client = TwitchClient()
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _json(payload, status_code=200):
+    return httpx.Response(status_code, content=orjson.dumps(payload))
+
+
+def _token_handler(token_requests, expires_in=3600):
+    """Answer OAuth calls with token-1, token-2, ..., counting them in ``token_requests``."""
+    def handle(request):
+        token_requests.append(request)
+        return _json({"access_token": f"token-{len(token_requests)}", "expires_in": expires_in})
+    return handle
+
+
+def test_twitch_token_is_cached_across_clients(twitch_settings):
+    token_requests = []
+    handler = _token_handler(token_requests)
+    
+    async def run():
+        first = _twitch_client(handler)
+        await first._ensure_authenticated()
+        second = _twitch_client(handler)
+        await second._ensure_authenticated()
+        return first.access_token, second._get_headers()["Authorization"]
+    
+    token, authorization = asyncio.run(run())
+    
+    assert len(token_requests) == 1
+    assert token == "token-1"
+    assert authorization == "Bearer token-1"
+
+
+def test_twitch_token_refreshed_after_expiry(twitch_settings):
+    token_requests = []
+    # expires_in is shortened by a 5 minute buffer, so this token is stale at once
+    handler = _token_handler(token_requests, expires_in=300)
+    
+    async def run():
+        client = _twitch_client(handler)
+        await client._ensure_authenticated()
+        await client._ensure_authenticated()
+        return client.access_token
+    
+    assert asyncio.run(run()) == "token-2"
+    assert len(token_requests) == 2
+
+
+def test_twitch_concurrent_401s_share_one_reauthentication(twitch_settings):
+    token_requests = []
+    issue_token = _token_handler(token_requests)
+    parallel = 5
+    
+    async def run():
+        rejected = []
+        all_rejected = asyncio.Event()
+        
+        async def handler(request):
+            if request.url.host == "id.twitch.tv":
+                return issue_token(request)
+            if request.headers["Authorization"] == "Bearer revoked":
+                # Hold every 401 until all requests have been sent with the revoked token
+                rejected.append(request)
+                if len(rejected) == parallel:
+                    all_rejected.set()
+                await all_rejected.wait()
+                return httpx.Response(401, request=request)
+            return _json({"data": [{"id": "1"}]})
+        
+        client = _twitch_client(handler)
+        # A cached token Twitch has since revoked
+        client.access_token = "revoked"
+        client._token_deadline = float("inf")
+        client._headers["Authorization"] = "Bearer revoked"
+        return await asyncio.gather(*(client.get_streams() for _ in range(parallel)))
+    
+    results = asyncio.run(run())
+    
+    assert len(token_requests) == 1
+    assert results == [{"data": [{"id": "1"}]}] * parallel
+
+
+def test_twitch_iter_streams_cancels_prefetch_on_early_exit(twitch_settings):
+    token_requests = []
+    issue_token = _token_handler(token_requests)
+    
+    async def run():
+        prefetch_started = asyncio.Event()
+        prefetch_cancelled = asyncio.Event()
+        
+        async def handler(request):
+            if request.url.host == "id.twitch.tv":
+                return issue_token(request)
+            if "after" not in request.url.params:
+                return _json({"data": [{"id": "1"}], "pagination": {"cursor": "page-2"}})
+            prefetch_started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                prefetch_cancelled.set()
+                raise
+        
+        client = _twitch_client(handler)
+        async with aclosing(client.iter_streams(max_results=500)) as pages:
+            async for page in pages:
+                await prefetch_started.wait()
+                break
+        
+        await asyncio.wait_for(prefetch_cancelled.wait(), timeout=1)
+        return page
+    
+    assert asyncio.run(run()) == [{"id": "1"}]
+
+
+def test_twitch_batched_lookups_chunk_and_dedupe(twitch_settings):
+    token_requests = []
+    issue_token = _token_handler(token_requests)
+    game_ids = [str(i) for i in range(250)]
+    
+    async def run():
+        lookups = []
+        
+        def handler(request):
+            if request.url.host == "id.twitch.tv":
+                return issue_token(request)
+            ids = request.url.params.get_list("id")
+            lookups.append(ids)
+            return _json({"data": [{"id": game_id} for game_id in ids]})
+        
+        client = _twitch_client(handler)
+        # Repeats, as when the same games show up on several stream pages
+        games = await client.get_games(game_ids=game_ids + game_ids[:10])
+        return lookups, games
+    
+    lookups, games = asyncio.run(run())
+    
+    assert sorted(len(ids) for ids in lookups) == [50, 100, 100]
+    assert sorted(game_id for ids in lookups for game_id in ids) == sorted(game_ids)
+    assert len(games) == 250
@@ -0,0 +1,48 @@
+"""Schema defaults and init_db against databases created by earlier schemas."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, text
+
+from app.database import engine, init_db
+from app.models import Channel
+
+
+def _snapshot_indexes():
+    return {index["name"] for index in inspect(engine).get_indexes("live_snapshots")}
+
+
+def test_init_db_migrates_existing_indexes():
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_game_collected_viewers"))
+        conn.execute(text("CREATE INDEX idx_game_collected ON live_snapshots (game_name, collected_at)"))
+        conn.execute(text("DROP INDEX idx_collected_at"))
+        conn.execute(text("CREATE INDEX idx_collected_at_desc ON live_snapshots (collected_at DESC)"))
+        conn.execute(text("CREATE INDEX ix_live_snapshots_collected_at ON live_snapshots (collected_at)"))
+
+    init_db()
+
+    indexes = _snapshot_indexes()
+    assert "idx_game_collected_viewers" in indexes
+    assert "idx_game_collected" not in indexes
+    assert "idx_collected_at" in indexes
+    assert "idx_collected_at_desc" not in indexes
+    assert "ix_live_snapshots_collected_at" not in indexes
+
+
+def test_init_db_is_idempotent():
+    before = _snapshot_indexes()
+    init_db()
+    init_db()
+    assert _snapshot_indexes() == before
+
+
+def test_server_default_timestamps_are_utc(db):
+    db.execute(text(
+        "INSERT INTO channels (platform, channel_id, username) VALUES ('kick', 'raw', 'raw')"
+    ))
+    db.commit()
+
+    channel = db.query(Channel).filter_by(channel_id="raw").one()
+    now = datetime.utcnow()
+    assert abs(channel.created_at - now) < timedelta(minutes=1)
+    assert abs(channel.updated_at - now) < timedelta(minutes=1)